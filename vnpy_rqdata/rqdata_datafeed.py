@@ -1,8 +1,14 @@
+import asyncio
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
+from threading import Lock
 from typing import Optional, Callable
 
+import numpy as np
 from numpy import ndarray
-from pandas import DataFrame
+from pandas import DataFrame, DatetimeIndex
 from rqdatac import init
 from rqdatac.services.get_price import get_price
 from rqdatac.services.future import get_dominant_price
@@ -13,20 +19,74 @@ from rqdatac.share.errors import RQDataError
 from vnpy.trader.setting import SETTINGS
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData, HistoryRequest
-from vnpy.trader.utility import round_to, ZoneInfo
+from vnpy.trader.utility import ZoneInfo, load_json, save_json
 from vnpy.trader.datafeed import BaseDatafeed
 
 
-INTERVAL_VT2RQ: dict[Interval, str] = {
-    Interval.MINUTE: "1m",
-    Interval.HOUR: "60m",
-    Interval.DAILY: "1d",
+INTERVAL_MAP: dict[Interval, tuple[str, timedelta]] = {
+    Interval.MINUTE: ("1m", timedelta(minutes=1)),
+    Interval.HOUR: ("60m", timedelta(hours=1)),
+    Interval.DAILY: ("1d", timedelta())         # no need to adjust for daily bar
 }
 
-INTERVAL_ADJUSTMENT_MAP: dict[Interval, timedelta] = {
-    Interval.MINUTE: timedelta(minutes=1),
-    Interval.HOUR: timedelta(hours=1),
-    Interval.DAILY: timedelta()         # no need to adjust for daily bar
+TICK_FIELD_RQ2VT: dict[str, str] = {
+    "open": "open_price",
+    "high": "high_price",
+    "low": "low_price",
+    "last": "last_price",
+    "prev_close": "pre_close",
+    "volume": "volume",
+    "total_turnover": "turnover",
+    "open_interest": "open_interest",
+    "limit_up": "limit_up",
+    "limit_down": "limit_down",
+    "b1": "bid_price_1",
+    "b2": "bid_price_2",
+    "b3": "bid_price_3",
+    "b4": "bid_price_4",
+    "b5": "bid_price_5",
+    "a1": "ask_price_1",
+    "a2": "ask_price_2",
+    "a3": "ask_price_3",
+    "a4": "ask_price_4",
+    "a5": "ask_price_5",
+    "b1_v": "bid_volume_1",
+    "b2_v": "bid_volume_2",
+    "b3_v": "bid_volume_3",
+    "b4_v": "bid_volume_4",
+    "b5_v": "bid_volume_5",
+    "a1_v": "ask_volume_1",
+    "a2_v": "ask_volume_2",
+    "a3_v": "ask_volume_3",
+    "a4_v": "ask_volume_4",
+    "a5_v": "ask_volume_5",
+}
+
+BAR_FIELDS: tuple[str, ...] = ("open", "high", "low", "close", "volume", "total_turnover")
+BAR_FIELDS_OI: tuple[str, ...] = BAR_FIELDS + ("open_interest",)
+
+TICK_BASE_FIELDS: tuple[str, ...] = (
+    "open",
+    "high",
+    "low",
+    "last",
+    "prev_close",
+    "volume",
+    "total_turnover",
+    "limit_up",
+    "limit_down",
+)
+
+# 按照（盘口深度，是否查询持仓量）预先生成Tick查询字段
+TICK_FIELDS: dict[tuple[int, bool], tuple[str, ...]] = {
+    (depth, with_oi): (
+        TICK_BASE_FIELDS
+        + tuple(f"{side}{i}" for side in ("b", "a") for i in range(1, depth + 1))
+        + tuple(f"{side}{i}_v" for side in ("b", "a") for i in range(1, depth + 1))
+        + (("open_interest",) if with_oi else ())
+    )
+    for depth in range(1, 6)
+    for with_oi in (False, True)
 }
 
 FUTURES_EXCHANGES: set[Exchange] = {
@@ -40,88 +100,89 @@ FUTURES_EXCHANGES: set[Exchange] = {
 
 CHINA_TZ = ZoneInfo("Asia/Shanghai")
 
+# 拆分品种代码和数字部分
+SYMBOL_PATTERN: re.Pattern = re.compile(r"(\D*)(.*)")
 
-def to_rq_symbol(symbol: str, exchange: Exchange, all_symbols: ndarray) -> str:
-    """将交易所代码转换为米筐代码"""
-    # 股票
-    if exchange in {Exchange.SSE, Exchange.SZSE}:
-        if exchange == Exchange.SSE:
-            rq_symbol: str = f"{symbol}.XSHG"
-        else:
-            rq_symbol: str = f"{symbol}.XSHE"
-    # 金交所现货
-    elif exchange == Exchange.SGE:
-        for char in ["(", ")", "+"]:
-            symbol: str = symbol.replace(char, "")
-        symbol = symbol.upper()
-        rq_symbol: str = f"{symbol}.SGEX"
-    # 期货和期权
-    elif exchange in {
-        Exchange.CFFEX,
-        Exchange.SHFE,
-        Exchange.DCE,
-        Exchange.CZCE,
-        Exchange.INE,
-        Exchange.GFEX
-    }:
-        for count, word in enumerate(symbol):
-            if word.isdigit():
-                break
+SYMBOLS_FILENAME: str = "rqdata_symbols.json"
 
-        product: str = symbol[:count]
-        time_str: str = symbol[count:]
 
-        # 期货
-        if time_str.isdigit():
-            # 只有郑商所需要特殊处理
-            if exchange is not Exchange.CZCE:
-                return symbol.upper()
+def convert_sse_symbol(symbol: str, all_symbols: frozenset[str]) -> str:
+    """转换上交所股票代码"""
+    return f"{symbol}.XSHG"
 
-            # 检查是否为连续合约或者指数合约
-            if time_str in ["88", "888", "99", "889"]:
-                return symbol
 
-            # 提取年月
-            year: str = symbol[count]
-            month: str = symbol[count + 1:]
+def convert_szse_symbol(symbol: str, all_symbols: frozenset[str]) -> str:
+    """转换深交所股票代码"""
+    return f"{symbol}.XSHE"
 
-            guess_1: str = f"{product}1{year}{month}".upper()
-            guess_2: str = f"{product}2{year}{month}".upper()
 
-            # 优先尝试20年后的合约
-            if guess_2 in all_symbols:
-                rq_symbol: str = guess_2
-            else:
-                rq_symbol: str = guess_1
-        # 期权以及期货次主力连续合约
-        else:
-            if time_str == "88A2":
-                return symbol
+def convert_sge_symbol(symbol: str, all_symbols: frozenset[str]) -> str:
+    """转换金交所现货代码"""
+    for char in ["(", ")", "+"]:
+        symbol: str = symbol.replace(char, "")
+    symbol = symbol.upper()
+    return f"{symbol}.SGEX"
 
-            if exchange in {
-                Exchange.CFFEX,
-                Exchange.DCE,
-                Exchange.SHFE,
-                Exchange.INE,
-                Exchange.GFEX
-            }:
-                rq_symbol: str = symbol.replace("-", "").upper()
-            elif exchange == Exchange.CZCE:
-                year: str = symbol[count]
-                suffix: str = symbol[count + 1:]
-
-                guess_1: str = f"{product}1{year}{suffix}".upper()
-                guess_2: str = f"{product}2{year}{suffix}".upper()
-
-                # 优先尝试20年后的合约
-                if guess_2 in all_symbols:
-                    rq_symbol: str = guess_2
-                else:
-                    rq_symbol: str = guess_1
+
+def convert_futures_symbol(symbol: str, all_symbols: frozenset[str]) -> str:
+    """转换期货和期权代码（郑商所除外）"""
+    product, time_str = SYMBOL_PATTERN.match(symbol).groups()
+
+    # 期货
+    if time_str.isdigit():
+        return symbol.upper()
+
+    # 期货次主力连续合约
+    if time_str == "88A2":
+        return symbol
+
+    # 期权
+    return symbol.replace("-", "").upper()
+
+
+def convert_czce_symbol(symbol: str, all_symbols: frozenset[str]) -> str:
+    """转换郑商所期货和期权代码"""
+    product, time_str = SYMBOL_PATTERN.match(symbol).groups()
+
+    # 检查是否为连续合约、指数合约或者次主力连续合约
+    if time_str in ["88", "888", "99", "889", "88A2"]:
+        return symbol
+
+    # 提取年份，期货后缀为月份，期权后缀为月份和行权信息
+    year: str = time_str[:1]
+    suffix: str = time_str[1:]
+
+    guess_1: str = f"{product}1{year}{suffix}".upper()
+    guess_2: str = f"{product}2{year}{suffix}".upper()
+
+    # 优先尝试20年后的合约
+    if guess_2 in all_symbols:
+        return guess_2
     else:
-        rq_symbol: str = f"{symbol}.{exchange.value}"
+        return guess_1
+
+
+SYMBOL_CONVERTERS: dict[Exchange, Callable[[str, frozenset[str]], str]] = {
+    Exchange.SSE: convert_sse_symbol,
+    Exchange.SZSE: convert_szse_symbol,
+    Exchange.SGE: convert_sge_symbol,
+    Exchange.CFFEX: convert_futures_symbol,
+    Exchange.SHFE: convert_futures_symbol,
+    Exchange.DCE: convert_futures_symbol,
+    Exchange.INE: convert_futures_symbol,
+    Exchange.GFEX: convert_futures_symbol,
+    Exchange.CZCE: convert_czce_symbol,
+}
 
-    return rq_symbol
+
+@lru_cache(maxsize=4096)
+def to_rq_symbol(symbol: str, exchange: Exchange, all_symbols: frozenset[str]) -> str:
+    """将交易所代码转换为米筐代码"""
+    converter: Callable = SYMBOL_CONVERTERS.get(exchange, None)
+    if converter:
+        return converter(symbol, all_symbols)
+    else:
+        return f"{symbol}.{exchange.value}"
 
 
 class RqdataDatafeed(BaseDatafeed):
@@ -131,47 +192,101 @@ class RqdataDatafeed(BaseDatafeed):
         """"""
         self.username: str = SETTINGS["datafeed.username"]
         self.password: str = SETTINGS["datafeed.password"]
+        self.max_pool_size: int = SETTINGS.get("datafeed.max_pool_size", 1)
+        self.tick_depth: int = SETTINGS.get("datafeed.tick_depth", 5)
 
         self.inited: bool = False
+        self.init_lock: Lock = Lock()
         self.symbols: ndarray = None
+        self.symbol_set: frozenset[str] = frozenset()
+        self.stock_map: dict[tuple[str, Exchange], str] = {}
 
     def init(self, output: Callable = print) -> bool:
         """初始化"""
         if self.inited:
             return True
 
-        if not self.username:
-            output("RQData数据服务初始化失败：用户名为空！")
-            return False
+        # 多线程并发查询时只允许一个线程执行初始化
+        with self.init_lock:
+            if self.inited:
+                return True
+
+            if not self.username:
+                output("RQData数据服务初始化失败：用户名为空！")
+                return False
+
+            if not self.password:
+                output("RQData数据服务初始化失败：密码为空！")
+                return False
+
+            try:
+                init(
+                    self.username,
+                    self.password,
+                    ("rqdatad-pro.ricequant.com", 16011),
+                    use_pool=True,
+                    max_pool_size=self.max_pool_size,
+                    auto_load_plugins=False
+                )
 
-        if not self.password:
-            output("RQData数据服务初始化失败：密码为空！")
-            return False
+                # 优先使用当日缓存的合约列表
+                symbols: list[str] = self.load_symbols()
+                if symbols:
+                    self.symbols = np.array(symbols, dtype=object)
+                else:
+                    df: DataFrame = all_instruments()
+                    self.symbols = df["order_book_id"].values
+                    self.save_symbols(self.symbols.tolist())
+
+                self.symbol_set = frozenset(self.symbols.tolist())
+
+                # 预先生成股票代码到米筐代码的映射
+                self.stock_map.clear()
+                for rq_symbol in self.symbol_set:
+                    if rq_symbol.endswith(".XSHG"):
+                        self.stock_map[(rq_symbol[:-5], Exchange.SSE)] = rq_symbol
+                    elif rq_symbol.endswith(".XSHE"):
+                        self.stock_map[(rq_symbol[:-5], Exchange.SZSE)] = rq_symbol
+
+                # 合约列表更新后清空代码转换缓存
+                to_rq_symbol.cache_clear()
+            except RQDataError as ex:
+                output(f"RQData数据服务初始化失败：{ex}")
+                return False
+            except RuntimeError as ex:
+                output(f"发生运行时错误：{ex}")
+                return False
+            except Exception as ex:
+                output(f"发生未知异常：{ex}")
+                return False
+
+            self.inited = True
+            return True
 
+    def load_symbols(self) -> list[str]:
+        """读取当日缓存的合约列表"""
         try:
-            init(
-                self.username,
-                self.password,
-                ("rqdatad-pro.ricequant.com", 16011),
-                use_pool=True,
-                max_pool_size=1,
-                auto_load_plugins=False
-            )
+            cache: dict = load_json(SYMBOLS_FILENAME)
+        except Exception:
+            return []
 
-            df: DataFrame = all_instruments()
-            self.symbols = df["order_book_id"].values
-        except RQDataError as ex:
-            output(f"RQData数据服务初始化失败：{ex}")
-            return False
-        except RuntimeError as ex:
-            output(f"发生运行时错误：{ex}")
-            return False
-        except Exception as ex:
-            output(f"发生未知异常：{ex}")
-            return False
-
-        self.inited = True
-        return True
+        today: str = datetime.now(CHINA_TZ).strftime("%Y%m%d")
+        if cache.get("date", "") != today:
+            return []
+
+        return cache.get("symbols", [])
+
+    def save_symbols(self, symbols: list[str]) -> None:
+        """缓存当日合约列表"""
+        cache: dict = {
+            "date": datetime.now(CHINA_TZ).strftime("%Y%m%d"),
+            "symbols": symbols
+        }
+
+        try:
+            save_json(SYMBOLS_FILENAME, cache)
+        except Exception:
+            pass
 
     def query_bar_history(self, req: HistoryRequest, output: Callable = print) -> Optional[list[BarData]]:
         """查询K线数据"""
@@ -181,6 +296,100 @@ class RqdataDatafeed(BaseDatafeed):
         else:
             return self._query_bar_history(req, output)
 
+    def query_bar_history_batch(
+        self,
+        reqs: list[HistoryRequest],
+        output: Callable = print,
+        max_workers: int = 0
+    ) -> list[Optional[list[BarData]]]:
+        """批量查询K线数据，结果顺序与请求一致"""
+        if not self.inited:
+            n: bool = self.init(output)
+            if not n:
+                return [[] for _ in reqs]
+
+        # 默认线程数和连接池大小一致
+        if not max_workers:
+            max_workers = self.max_pool_size
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures: list[Future] = [
+                executor.submit(self.query_bar_history, req, output) for req in reqs
+            ]
+            return [future.result() for future in futures]
+
+    def query_bar_history_grouped(
+        self,
+        reqs: list[HistoryRequest],
+        output: Callable = print
+    ) -> list[Optional[list[BarData]]]:
+        """批量查询K线数据，相同周期和时间范围的合约合并为一次请求"""
+        if not self.inited:
+            n: bool = self.init(output)
+            if not n:
+                return [[] for _ in reqs]
+
+        results: list[Optional[list[BarData]]] = [[] for _ in reqs]
+
+        # 按照（周期，开始时间，结束时间，是否查询持仓量）分组，记录每个米筐代码对应的请求位置
+        groups: dict[tuple, dict[str, list[int]]] = {}
+
+        for ix, req in enumerate(reqs):
+            # 主力连续合约无法合并查询
+            if req.exchange in FUTURES_EXCHANGES and req.symbol.isalpha():
+                results[ix] = self._query_dominant_history(req, output)
+                continue
+
+            rq_symbol: str = self._get_rq_symbol(req.symbol, req.exchange)
+            if rq_symbol not in self.symbol_set:
+                output(f"RQData查询K线数据失败：不支持的合约代码{req.vt_symbol}")
+                continue
+
+            if req.interval not in INTERVAL_MAP:
+                output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
+                continue
+
+            key: tuple = (req.interval, req.start, req.end, not req.symbol.isdigit())
+            groups.setdefault(key, {}).setdefault(rq_symbol, []).append(ix)
+
+        for (interval, start, end, with_oi), symbol_ixs in groups.items():
+            rq_interval, adjustment = INTERVAL_MAP[interval]
+
+            # 只对衍生品合约才查询持仓量数据
+            fields: tuple = BAR_FIELDS_OI if with_oi else BAR_FIELDS
+
+            df: DataFrame = get_price(
+                list(symbol_ixs),
+                frequency=rq_interval,
+                fields=fields,
+                start_date=start,
+                end_date=get_next_trading_date(end),    # 为了查询夜盘数据
+                adjust_type="none"
+            )
+
+            if df is None:
+                continue
+
+            for rq_symbol, sub_df in df.groupby(level=0):
+                for ix in symbol_ixs.get(rq_symbol, []):
+                    req: HistoryRequest = reqs[ix]
+                    results[ix] = self._to_bar_data(sub_df, req.symbol, req.exchange, interval, end, adjustment)
+
+        return results
+
+    async def query_bar_history_async(self, req: HistoryRequest, output: Callable = print) -> Optional[list[BarData]]:
+        """在线程中查询K线数据，供异步代码并发调用"""
+        return await asyncio.to_thread(self.query_bar_history, req, output)
+
+    async def query_tick_history_async(
+        self,
+        req: HistoryRequest,
+        output: Callable = print,
+        depth: int = 0
+    ) -> Optional[list[TickData]]:
+        """在线程中查询Tick数据，供异步代码并发调用"""
+        return await asyncio.to_thread(self.query_tick_history, req, output, depth)
+
     def _query_bar_history(self, req: HistoryRequest, output: Callable = print) -> Optional[list[BarData]]:
         """查询K线数据"""
         if not self.inited:
@@ -194,29 +403,23 @@ class RqdataDatafeed(BaseDatafeed):
         start: datetime = req.start
         end: datetime = req.end
 
-        # 股票期权不添加交易所后缀
-        if exchange in [Exchange.SSE, Exchange.SZSE] and symbol in self.symbols:
-            rq_symbol: str = symbol
-        else:
-            rq_symbol: str = to_rq_symbol(symbol, exchange, self.symbols)
+        rq_symbol: str = self._get_rq_symbol(symbol, exchange)
 
         # 检查查询的代码在范围内
-        if rq_symbol not in self.symbols:
+        if rq_symbol not in self.symbol_set:
             output(f"RQData查询K线数据失败：不支持的合约代码{req.vt_symbol}")
             return []
 
-        rq_interval: str = INTERVAL_VT2RQ.get(interval)
-        if not rq_interval:
+        # 米筐时间周期，以及将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）的调整量
+        interval_pair: Optional[tuple[str, timedelta]] = INTERVAL_MAP.get(interval, None)
+        if not interval_pair:
             output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
             return []
 
-        # 为了将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）
-        adjustment: timedelta = INTERVAL_ADJUSTMENT_MAP[interval]
+        rq_interval, adjustment = interval_pair
 
         # 只对衍生品合约才查询持仓量数据
-        fields: list = ["open", "high", "low", "close", "volume", "total_turnover"]
-        if not symbol.isdigit():
-            fields.append("open_interest")
+        fields: tuple = BAR_FIELDS_OI if not symbol.isdigit() else BAR_FIELDS
 
         df: DataFrame = get_price(
             rq_symbol,
@@ -230,37 +433,17 @@ class RqdataDatafeed(BaseDatafeed):
         data: list[BarData] = []
 
         if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
-
-            for row in df.itertuples():
-                dt: datetime = row.Index[1].to_pydatetime() - adjustment
-                dt: datetime = dt.replace(tzinfo=CHINA_TZ)
-
-                if dt >= end:
-                    break
-
-                bar: BarData = BarData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    interval=interval,
-                    datetime=dt,
-                    open_price=round_to(row.open, 0.000001),
-                    high_price=round_to(row.high, 0.000001),
-                    low_price=round_to(row.low, 0.000001),
-                    close_price=round_to(row.close, 0.000001),
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    gateway_name="RQ"
-                )
-
-                data.append(bar)
+            data = self._to_bar_data(df, symbol, exchange, interval, end, adjustment)
 
         return data
 
-    def query_tick_history(self, req: HistoryRequest, output: Callable = print) -> Optional[list[TickData]]:
-        """查询Tick数据"""
+    def query_tick_history(
+        self,
+        req: HistoryRequest,
+        output: Callable = print,
+        depth: int = 0
+    ) -> Optional[list[TickData]]:
+        """查询Tick数据，depth为查询的盘口深度，为0时使用全局配置"""
         if not self.inited:
             n: bool = self.init(output)
             if not n:
@@ -271,50 +454,18 @@ class RqdataDatafeed(BaseDatafeed):
         start: datetime = req.start
         end: datetime = req.end
 
-        # 股票期权不添加交易所后缀
-        if exchange in [Exchange.SSE, Exchange.SZSE] and symbol in self.symbols:
-            rq_symbol: str = symbol
-        else:
-            rq_symbol: str = to_rq_symbol(symbol, exchange, self.symbols)
+        rq_symbol: str = self._get_rq_symbol(symbol, exchange)
 
-        if rq_symbol not in self.symbols:
+        if rq_symbol not in self.symbol_set:
             output(f"RQData查询Tick数据失败：不支持的合约代码{req.vt_symbol}")
             return []
 
-        # 只对衍生品合约才查询持仓量数据
-        fields: list = [
-            "open",
-            "high",
-            "low",
-            "last",
-            "prev_close",
-            "volume",
-            "total_turnover",
-            "limit_up",
-            "limit_down",
-            "b1",
-            "b2",
-            "b3",
-            "b4",
-            "b5",
-            "a1",
-            "a2",
-            "a3",
-            "a4",
-            "a5",
-            "b1_v",
-            "b2_v",
-            "b3_v",
-            "b4_v",
-            "b5_v",
-            "a1_v",
-            "a2_v",
-            "a3_v",
-            "a4_v",
-            "a5_v",
-        ]
-        if not symbol.isdigit():
-            fields.append("open_interest")
+        # 只查询需要的盘口深度（未查询的档位保持为0），只对衍生品合约才查询持仓量数据
+        if not depth:
+            depth = self.tick_depth
+        depth = min(max(depth, 1), 5)
+
+        fields: tuple = TICK_FIELDS[(depth, not symbol.isdigit())]
 
         df: DataFrame = get_price(
             rq_symbol,
@@ -328,52 +479,31 @@ class RqdataDatafeed(BaseDatafeed):
         data: list[TickData] = []
 
         if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
-
-            for row in df.itertuples():
-                dt: datetime = row.Index[1].to_pydatetime()
-                dt: datetime = dt.replace(tzinfo=CHINA_TZ)
-
+            dts: list[datetime] = self._to_datetimes(df)
+
+            # 按列提取数据并将NaN填充为0，缺失的字段保持TickData默认值
+            present: list[str] = [field for field in fields if field in df.columns]
+            names: list[str] = [TICK_FIELD_RQ2VT[field] for field in present]
+            columns: list[list] = [np.nan_to_num(df[field].values).tolist() for field in present]
+
+            # 预先构造模板属性，逐行复制后直接赋值，跳过构造函数的关键字参数绑定
+            template: dict = TickData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=end,
+                gateway_name="RQ"
+            ).__dict__
+
+            for dt, values in zip(dts, zip(*columns)):
                 if dt >= end:
                     break
 
-                tick: TickData = TickData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    datetime=dt,
-                    open_price=row.open,
-                    high_price=row.high,
-                    low_price=row.low,
-                    pre_close=row.prev_close,
-                    last_price=row.last,
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    limit_up=row.limit_up,
-                    limit_down=row.limit_down,
-                    bid_price_1=row.b1,
-                    bid_price_2=row.b2,
-                    bid_price_3=row.b3,
-                    bid_price_4=row.b4,
-                    bid_price_5=row.b5,
-                    ask_price_1=row.a1,
-                    ask_price_2=row.a2,
-                    ask_price_3=row.a3,
-                    ask_price_4=row.a4,
-                    ask_price_5=row.a5,
-                    bid_volume_1=row.b1_v,
-                    bid_volume_2=row.b2_v,
-                    bid_volume_3=row.b3_v,
-                    bid_volume_4=row.b4_v,
-                    bid_volume_5=row.b5_v,
-                    ask_volume_1=row.a1_v,
-                    ask_volume_2=row.a2_v,
-                    ask_volume_3=row.a3_v,
-                    ask_volume_4=row.a4_v,
-                    ask_volume_5=row.a5_v,
-                    gateway_name="RQ"
-                )
+                d: dict = template.copy()
+                d["datetime"] = dt
+                d.update(zip(names, values))
+
+                tick: TickData = TickData.__new__(TickData)
+                tick.__dict__ = d
 
                 data.append(tick)
 
@@ -392,18 +522,16 @@ class RqdataDatafeed(BaseDatafeed):
         start: datetime = req.start
         end: datetime = req.end
 
-        rq_interval: str = INTERVAL_VT2RQ.get(interval)
-        if not rq_interval:
+        # 米筐时间周期，以及将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）的调整量
+        interval_pair: Optional[tuple[str, timedelta]] = INTERVAL_MAP.get(interval, None)
+        if not interval_pair:
             output(f"RQData查询K线数据失败：不支持的时间周期{req.interval.value}")
             return []
 
-        # 为了将米筐时间戳（K线结束时点）转换为VeighNa时间戳（K线开始时点）
-        adjustment: timedelta = INTERVAL_ADJUSTMENT_MAP[interval]
+        rq_interval, adjustment = interval_pair
 
         # 只对衍生品合约才查询持仓量数据
-        fields: list = ["open", "high", "low", "close", "volume", "total_turnover"]
-        if not symbol.isdigit():
-            fields.append("open_interest")
+        fields: tuple = BAR_FIELDS_OI if not symbol.isdigit() else BAR_FIELDS
 
         df: DataFrame = get_dominant_price(
             symbol.upper(),                         # 合约代码用大写
@@ -418,31 +546,89 @@ class RqdataDatafeed(BaseDatafeed):
         data: list[BarData] = []
 
         if df is not None:
-            # 填充NaN为0
-            df.fillna(0, inplace=True)
+            data = self._to_bar_data(df, symbol, exchange, interval, end, adjustment)
 
-            for row in df.itertuples():
-                dt: datetime = row.Index[1].to_pydatetime() - adjustment
-                dt: datetime = dt.replace(tzinfo=CHINA_TZ)
+        return data
 
-                if dt >= end:
-                    break
+    def _to_bar_data(
+        self,
+        df: DataFrame,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        end: datetime,
+        adjustment: timedelta
+    ) -> list[BarData]:
+        """将K线DataFrame按列转换为BarData列表"""
+        dts: list[datetime] = self._to_datetimes(df, adjustment)
+
+        # 价格整列四舍五入到6位小数，并将NaN填充为0
+        opens: list = np.nan_to_num(np.round(df["open"].values, 6), copy=False).tolist()
+        highs: list = np.nan_to_num(np.round(df["high"].values, 6), copy=False).tolist()
+        lows: list = np.nan_to_num(np.round(df["low"].values, 6), copy=False).tolist()
+        closes: list = np.nan_to_num(np.round(df["close"].values, 6), copy=False).tolist()
+        volumes: list = np.nan_to_num(df["volume"].values).tolist()
+        turnovers: list = np.nan_to_num(df["total_turnover"].values).tolist()
+
+        if "open_interest" in df.columns:
+            open_interests: list = np.nan_to_num(df["open_interest"].values).tolist()
+        else:
+            open_interests: list = [0] * len(df)
 
-                bar: BarData = BarData(
-                    symbol=symbol,
-                    exchange=exchange,
-                    interval=interval,
-                    datetime=dt,
-                    open_price=round_to(row.open, 0.000001),
-                    high_price=round_to(row.high, 0.000001),
-                    low_price=round_to(row.low, 0.000001),
-                    close_price=round_to(row.close, 0.000001),
-                    volume=row.volume,
-                    turnover=row.total_turnover,
-                    open_interest=getattr(row, "open_interest", 0),
-                    gateway_name="RQ"
-                )
+        data: list[BarData] = []
+
+        # 预先构造模板属性，逐行复制后直接赋值，跳过构造函数的关键字参数绑定
+        template: dict = BarData(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime=end,
+            gateway_name="RQ"
+        ).__dict__
+
+        for dt, open_price, high_price, low_price, close_price, volume, turnover, open_interest in zip(
+            dts, opens, highs, lows, closes, volumes, turnovers, open_interests
+        ):
+            if dt >= end:
+                break
+
+            d: dict = template.copy()
+            d["datetime"] = dt
+            d["open_price"] = open_price
+            d["high_price"] = high_price
+            d["low_price"] = low_price
+            d["close_price"] = close_price
+            d["volume"] = volume
+            d["turnover"] = turnover
+            d["open_interest"] = open_interest
+
+            bar: BarData = BarData.__new__(BarData)
+            bar.__dict__ = d
 
-                data.append(bar)
+            data.append(bar)
 
         return data
+
+    def _to_datetimes(self, df: DataFrame, adjustment: timedelta = timedelta()) -> list[datetime]:
+        """将时间戳索引整列转换为带时区的datetime列表"""
+        dt_index: DatetimeIndex = df.index.get_level_values(1)
+
+        # 整列设置时区，避免逐行调用replace
+        if dt_index.tz is None:
+            dt_index = dt_index.tz_localize(CHINA_TZ)
+        else:
+            dt_index = dt_index.tz_convert(CHINA_TZ)
+
+        return (dt_index - adjustment).to_pydatetime().tolist()
+
+    def _get_rq_symbol(self, symbol: str, exchange: Exchange) -> str:
+        """获取查询用的米筐代码"""
+        if exchange in {Exchange.SSE, Exchange.SZSE}:
+            # 股票期权不添加交易所后缀
+            if symbol in self.symbol_set:
+                return symbol
+            # 同一代码可能同时存在于上交所和深交所（如指数和股票），因此按交易所区分
+            else:
+                return self.stock_map.get((symbol, exchange), "")
+        else:
+            return to_rq_symbol(symbol, exchange, self.symbol_set)
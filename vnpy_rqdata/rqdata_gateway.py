@@ -1,4 +1,9 @@
-from threading import Thread
+from threading import Thread, Lock
+from multiprocessing import get_context, Process, Queue
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from functools import lru_cache
 from datetime import datetime
 
 from pandas import DataFrame
@@ -18,11 +23,14 @@ from vnpy.trader.object import (
     TickData,
     ContractData
 )
-from vnpy.trader.utility import ZoneInfo
+from vnpy.trader.utility import ZoneInfo, load_json, save_json
 
 
 CHINA_TZ = ZoneInfo("Asia/Shanghai")
 
+INSTRUMENTS_FILENAME = "rqdata_instruments.json"
+PROCESS_INIT_TIMEOUT = 30        # 行情进程初始化等待秒数
+
 
 EXCHANGE_VT2RQDATA = {
     Exchange.SSE: "XSHG",
@@ -37,18 +45,39 @@ EXCHANGE_VT2RQDATA = {
 EXCHANGE_RQDATA2VT = {v: k for k, v in EXCHANGE_VT2RQDATA.items()}
 
 
-PRODUCT_MAP = {
-    "CS": Product.EQUITY,
-    "INDX": Product.INDEX,
-    "ETF": Product.FUND,
-    "LOF": Product.FUND,
-    "FUND": Product.FUND,
-    "Future": Product.FUTURES,
-    "Option": Product.OPTION,
-    "Convertible": Product.BOND,
-    "Repo": Product.BOND
+# 合约类型对应的（产品类型，合约乘数，最小价格变动，产品名称），期货合约乘数从数据中读取
+PRODUCT_META_MAP = {
+    "CS": (Product.EQUITY, 1, 0.01, "股票"),
+    "INDX": (Product.INDEX, 1, 0.01, "指数"),
+    "ETF": (Product.FUND, 1, 0.001, "基金"),
+    "LOF": (Product.FUND, 1, 0.001, "基金"),
+    "FUND": (Product.FUND, 1, 0.001, "基金"),
+    "Future": (Product.FUTURES, None, 0.01, "期货")
 }
 
+CONTRACT_COLUMNS = [
+    "order_book_id",
+    "trading_code",
+    "exchange",
+    "symbol",
+    "type",
+    "round_lot",
+    "contract_multiplier"
+]
+
+
+@lru_cache(maxsize=65536)
+def to_rq_channel(symbol: str, exchange: Exchange) -> tuple[str, str]:
+    """生成行情订阅频道，期货同时返回米筐代码"""
+    # 证券
+    if exchange in {Exchange.SSE, Exchange.SZSE}:
+        rq_exchange: str = EXCHANGE_VT2RQDATA[exchange]
+        return f"tick_{symbol}.{rq_exchange}", ""
+    # 期货
+    else:
+        rq_symbol: str = symbol.upper()
+        return f"tick_{rq_symbol}", rq_symbol
+
 
 class RqdataGateway(BaseGateway):
     """
@@ -57,9 +86,10 @@ class RqdataGateway(BaseGateway):
 
     default_name: str = "RQDATA"
 
-    default_setting: dict[str, str] = {
+    default_setting: dict = {
         "用户名": "",
-        "密码": ""
+        "密码": "",
+        "独立进程": ["否", "是"]
     }
 
     exchanges: list[str] = list(EXCHANGE_VT2RQDATA.keys())
@@ -70,9 +100,15 @@ class RqdataGateway(BaseGateway):
         self.client: LiveMarketDataClient = None
         self.thread: Thread = None
 
+        # 订阅相关数据可能被多个线程访问，需要加锁保护
+        self.lock: Lock = Lock()
         self.subscribed: set[str] = set()
         self.futures_map: dict[str, tuple[str, Exchange]] = {}      # 期货代码交易所映射信息
-        self.symbol_map: dict[str, str] = {}
+        self.symbol_map: dict[str, ContractData] = {}
+        self.tick_templates: dict[str, dict] = {}                   # 行情推送的Tick属性模板
+
+        # 行情推送回调中使用的绑定方法缓存
+        self.push_tick: Callable = None
 
     def connect(self, setting: dict) -> None:
         """连接交易接口"""
@@ -84,7 +120,8 @@ class RqdataGateway(BaseGateway):
         password: str = setting["密码"]
 
         try:
-            init(username, password)
+            # 使用连接池以支持多线程并发查询合约
+            init(username, password, use_pool=True, max_pool_size=4)
         except Exception as ex:
             self.write_log(f"RQData接口初始化失败：{ex}")
             return
@@ -92,35 +129,51 @@ class RqdataGateway(BaseGateway):
         # 查询合约信息
         self.query_contract()
 
-        # 创建实时行情客户端
-        self.client = LiveMarketDataClient()
+        # 创建实时行情客户端，可选在独立进程中接收推送
+        if setting.get("独立进程", "否") == "是":
+            try:
+                client: ProcessMarketDataClient = ProcessMarketDataClient(username, password)
+            except Exception as ex:
+                self.write_log(f"RQData行情进程启动失败：{ex}")
+                return
+
+            self.client = client
+            handler: Callable = self.handle_tick        # 子进程中已完成推送数据解析
+        else:
+            self.client = LiveMarketDataClient()
+            handler: Callable = self.handle_msg
+
+        # 缓存绑定方法，避免每个Tick推送时重新创建
+        self.push_tick = self.on_tick
 
         # 启动运行线程
-        self.thread = self.client.listen(handler=self.handle_msg)
+        self.thread = self.client.listen(handler=handler)
 
-        # 订阅之前行情
-        for rq_channel in self.subscribed:
-            self.clicent.subscrbie(rq_channel)
+        # 订阅之前行情，加锁只复制频道列表，网络请求在锁外执行
+        client: LiveMarketDataClient = self.client
+        with self.lock:
+            channels: list[str] = list(self.subscribed)
+
+        for rq_channel in channels:
+            client.subscribe(rq_channel)
 
         self.write_log("RQData接口初始化成功")
 
     def subscribe(self, req: SubscribeRequest) -> None:
         """订阅行情"""
-        # 证券
-        if req.exchange in {Exchange.SSE, Exchange.SZSE}:
-            rq_exchange: str = EXCHANGE_VT2RQDATA[req.exchange]
-            rq_channel: str = f"tick_{req.symbol}.{rq_exchange}"
-        # 期货
-        else:
-            rq_symbol: str = req.symbol.upper()
-            rq_channel: str = f"tick_{rq_symbol}"
+        rq_channel, rq_symbol = to_rq_channel(req.symbol, req.exchange)
 
-            self.futures_map[rq_symbol] = (req.symbol, req.exchange)
+        # 加锁更新订阅数据并读取客户端，订阅请求在锁外执行，避免阻塞其他线程
+        with self.lock:
+            # 期货
+            if rq_symbol:
+                self.futures_map[rq_symbol] = (req.symbol, req.exchange)
 
-        self.subscribed.add(rq_channel)
+            self.subscribed.add(rq_channel)
+            client: LiveMarketDataClient = self.client
 
-        if self.client:
-            self.client.subscribe(rq_channel)
+        if client:
+            client.subscribe(rq_channel)
 
     def send_order(self, req: OrderRequest) -> str:
         """委托下单"""
@@ -146,111 +199,286 @@ class RqdataGateway(BaseGateway):
 
     def query_contract(self) -> None:
         """查询合约"""
-        for t in ["CS", "INDX", "ETF", "Future"]:
-            df: DataFrame = all_instruments(type=t)
+        self.tick_templates.clear()
+
+        types: list[str] = ["CS", "INDX", "ETF", "Future"]
+
+        # 优先使用当日缓存的合约信息，否则并行发起各类合约的查询请求
+        instruments: dict[str, list[dict]] = self.load_instruments(types)
+        if not instruments:
+            with ThreadPoolExecutor(len(types)) as executor:
+                instruments = dict(zip(types, executor.map(self.query_instruments, types)))
+
+            self.save_instruments(instruments)
 
-            for tp in df.itertuples():
+        # 循环中用到的字典方法提前绑定为局部变量
+        get_exchange: Callable = EXCHANGE_RQDATA2VT.get
+        meta_map: dict = PRODUCT_META_MAP
+
+        for t, records in instruments.items():
+            contracts: list[ContractData] = []
+            symbol_map: dict[str, ContractData] = {}
+
+            for tp in records:
                 if t == "INDX":
-                    symbol, rq_exchange = tp.order_book_id.split(".")
-                    exchange: Exchange = EXCHANGE_RQDATA2VT.get(rq_exchange, None)
+                    symbol, rq_exchange = tp["order_book_id"].split(".")
+                    exchange: Exchange = get_exchange(rq_exchange, None)
                 else:
-                    symbol: str = tp.trading_code
-                    exchange: Exchange = EXCHANGE_RQDATA2VT.get(tp.exchange, None)
+                    symbol: str = tp["trading_code"]
+                    exchange: Exchange = get_exchange(tp["exchange"], None)
 
                 if not exchange:
                     continue
 
-                min_volume: float = tp.round_lot
-
-                product: Product = PRODUCT_MAP[tp.type]
-                if product == Product.EQUITY:
-                    size: int = 1
-                    pricetick: float = 0.01
-                    product_name: str = "股票"
-                elif product == Product.FUND:
-                    size: int = 1
-                    pricetick: float = 0.001
-                    product_name: str = "基金"
-                elif product == Product.INDEX:
-                    size: int = 1
-                    pricetick: float = 0.01
-                    product_name: str = "指数"
-                elif product == Product.FUTURES:
-                    size: int = tp.contract_multiplier
-                    pricetick: float = 0.01
-                    product_name: str = "期货"
+                min_volume: float = tp["round_lot"]
+
+                product, size, pricetick, _ = meta_map[tp["type"]]
+                if size is None:
+                    size = tp["contract_multiplier"]
 
                 contract = ContractData(
                     symbol=symbol,
                     exchange=exchange,
-                    name=tp.symbol,
+                    name=tp["symbol"],
                     product=product,
                     size=size,
                     pricetick=pricetick,
                     min_volume=min_volume,
                     gateway_name=self.gateway_name
                 )
-                self.on_contract(contract)
+                contracts.append(contract)
+
+                symbol_map[tp["order_book_id"]] = contract
 
-                self.symbol_map[tp.order_book_id] = contract
+            # 先批量更新映射表，再统一推送合约事件
+            self.symbol_map.update(symbol_map)
+
+            for contract in contracts:
+                self.on_contract(contract)
 
+            product_name: str = meta_map[t][3]
             self.write_log(f"{product_name}合约信息查询成功")
 
+    def query_instruments(self, t: str) -> list[dict]:
+        """查询合约信息，只保留用到的字段"""
+        df: DataFrame = all_instruments(type=t)
+        columns: list[str] = [c for c in CONTRACT_COLUMNS if c in df.columns]
+        return df[columns].to_dict("records")
+
+    def load_instruments(self, types: list[str]) -> dict[str, list[dict]]:
+        """读取当日缓存的合约信息"""
+        try:
+            cache: dict = load_json(INSTRUMENTS_FILENAME)
+        except Exception:
+            return {}
+
+        today: str = datetime.now(CHINA_TZ).strftime("%Y%m%d")
+        if cache.get("date", "") != today:
+            return {}
+
+        instruments: dict[str, list[dict]] = cache.get("instruments", {})
+        if any(t not in instruments for t in types):
+            return {}
+
+        return {t: instruments[t] for t in types}
+
+    def save_instruments(self, instruments: dict[str, list[dict]]) -> None:
+        """缓存当日合约信息"""
+        cache: dict = {
+            "date": datetime.now(CHINA_TZ).strftime("%Y%m%d"),
+            "instruments": instruments
+        }
+
+        try:
+            save_json(INSTRUMENTS_FILENAME, cache)
+        except Exception:
+            pass
+
     def handle_msg(self, data: dict) -> None:
         """处理行情推送"""
-        contract: ContractData = self.symbol_map.get(data["order_book_id"], None)
-        if not contract:
-            self.write_log(f"收到不支持合约{data['order_book_id']}的行情推送")
-            return
+        self.handle_tick(parse_tick(data))
+
+    def handle_tick(self, payload: tuple[str, dict]) -> None:
+        """基于解析后的行情数据生成Tick并推送"""
+        rq_symbol, fields = payload
+        template: dict = self.tick_templates.get(rq_symbol, None)
+
+        # 首次收到推送时，基于合约信息生成Tick属性模板
+        if template is None:
+            contract: ContractData = self.symbol_map.get(rq_symbol, None)
+            if not contract:
+                self.write_log(f"收到不支持合约{rq_symbol}的行情推送")
+                return
+
+            template = TickData(
+                symbol=contract.symbol,
+                exchange=contract.exchange,
+                name=contract.name,
+                datetime=datetime.now(CHINA_TZ),
+                gateway_name=self.gateway_name
+            ).__dict__
+            self.tick_templates[rq_symbol] = template
+
+        # 复制模板后直接写入属性字典，跳过TickData构造函数
+        d: dict = template.copy()
+        d.update(fields)
+
+        tick: TickData = TickData.__new__(TickData)
+        tick.__dict__ = d
+
+        self.push_tick(tick)
+
+
+def parse_tick(data: dict) -> tuple[str, dict]:
+    """解析行情推送，返回米筐代码和Tick属性字典"""
+    # 时间戳格式为YYYYMMDDHHMMSSmmm，直接整数拆分代替strptime
+    v: int = data["datetime"]
+    if not isinstance(v, int):
+        v = int(v)
+
+    v, ms = divmod(v, 1000)
+    v, second = divmod(v, 100)
+    v, minute = divmod(v, 100)
+    v, hour = divmod(v, 100)
+    v, day = divmod(v, 100)
+    year, month = divmod(v, 100)
+
+    dt: datetime = datetime(year, month, day, hour, minute, second, ms * 1000, CHINA_TZ)
+
+    d: dict = {
+        "datetime": dt,
+        "volume": data["volume"],
+        "turnover": data["total_turnover"],
+        "open_interest": data.get("open_interest", 0),
+        "last_price": data["last"],
+        "limit_up": data.get("limit_up", 0),
+        "limit_down": data.get("limit_down", 0),
+        "open_price": data["open"],
+        "high_price": data["high"],
+        "low_price": data["low"],
+        "pre_close": data["prev_close"]
+    }
 
-        dt: datetime = datetime.strptime(str(data["datetime"]), "%Y%m%d%H%M%S%f")
-        dt = dt.replace(tzinfo=CHINA_TZ)
-        tick: TickData = TickData(
-            symbol=contract.symbol,
-            exchange=contract.exchange,
-            name=contract.name,
-            datetime=dt,
-            volume=data["volume"],
-            turnover=data["total_turnover"],
-            open_interest=data.get("open_interest", 0),
-            last_price=data["last"],
-            limit_up=data.get("limit_up", 0),
-            limit_down=data.get("limit_down", 0),
-            open_price=data["open"],
-            high_price=data["high"],
-            low_price=data["low"],
-            pre_close=data["prev_close"],
-            gateway_name=self.gateway_name
+    bid: list[float] = data.get("bid", None)
+    if bid is not None:
+        # 只取前五档，推送档位更多时也不影响解包
+        bp0, bp1, bp2, bp3, bp4 = bid[:5]
+        ap0, ap1, ap2, ap3, ap4 = data["ask"][:5]
+        bv0, bv1, bv2, bv3, bv4 = data["bid_vol"][:5]
+        av0, av1, av2, av3, av4 = data["ask_vol"][:5]
+
+        d.update(
+            bid_price_1=bp0,
+            bid_price_2=bp1,
+            bid_price_3=bp2,
+            bid_price_4=bp3,
+            bid_price_5=bp4,
+            ask_price_1=ap0,
+            ask_price_2=ap1,
+            ask_price_3=ap2,
+            ask_price_4=ap3,
+            ask_price_5=ap4,
+            bid_volume_1=bv0,
+            bid_volume_2=bv1,
+            bid_volume_3=bv2,
+            bid_volume_4=bv3,
+            bid_volume_5=bv4,
+            ask_volume_1=av0,
+            ask_volume_2=av1,
+            ask_volume_3=av2,
+            ask_volume_4=av3,
+            ask_volume_5=av4
         )
 
-        if "bid" in data:
-            bp: list[float] = data["bid"]
-            ap: list[float] = data["ask"]
-            bv: list[float] = data["bid_vol"]
-            av: list[float] = data["ask_vol"]
-
-            tick.bid_price_1 = bp[0]
-            tick.bid_price_2 = bp[1]
-            tick.bid_price_3 = bp[2]
-            tick.bid_price_4 = bp[3]
-            tick.bid_price_5 = bp[4]
-
-            tick.ask_price_1 = ap[0]
-            tick.ask_price_2 = ap[1]
-            tick.ask_price_3 = ap[2]
-            tick.ask_price_4 = ap[3]
-            tick.ask_price_5 = ap[4]
-
-            tick.bid_volume_1 = bv[0]
-            tick.bid_volume_2 = bv[1]
-            tick.bid_volume_3 = bv[2]
-            tick.bid_volume_4 = bv[3]
-            tick.bid_volume_5 = bv[4]
-
-            tick.ask_volume_1 = av[0]
-            tick.ask_volume_2 = av[1]
-            tick.ask_volume_3 = av[2]
-            tick.ask_volume_4 = av[3]
-            tick.ask_volume_5 = av[4]
-
-        self.on_tick(tick)
+    return data["order_book_id"], d
+
+
+class ProcessMarketDataClient:
+    """
+    在独立进程中运行的实时行情客户端，接口与LiveMarketDataClient一致。
+
+    子进程负责网络收包和推送数据解析，回调函数收到的是parse_tick的结果。
+    """
+
+    def __init__(self, username: str, password: str) -> None:
+        """"""
+        context = get_context("spawn")
+
+        self.command_queue: Queue = context.Queue()
+        self.data_queue: Queue = context.Queue()
+
+        self.process: Process = context.Process(
+            target=run_market_process,
+            args=(username, password, self.command_queue, self.data_queue),
+            daemon=True
+        )
+        self.process.start()
+
+        # 等待子进程返回初始化结果，失败时直接抛出异常
+        try:
+            error: str = self.data_queue.get(timeout=PROCESS_INIT_TIMEOUT)
+        except Empty:
+            self.process.terminate()
+            self.process.join()
+            raise TimeoutError("等待行情进程初始化超时")
+
+        if error:
+            self.process.join()
+            raise ConnectionError(error)
+
+        if not self.process.is_alive():
+            raise ConnectionError(f"行情进程已退出，退出码{self.process.exitcode}")
+
+    def subscribe(self, rq_channel: str) -> None:
+        """订阅行情"""
+        self.command_queue.put(rq_channel)
+
+    def listen(self, handler: Callable) -> Thread:
+        """启动推送数据处理线程"""
+        thread: Thread = Thread(target=self.run, args=(handler,), daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, handler: Callable) -> None:
+        """从队列中读取解析后的推送数据并回调"""
+        while True:
+            payload: Optional[tuple[str, dict]] = self.data_queue.get()
+            if payload is None:
+                break
+
+            handler(payload)
+
+    def close(self) -> None:
+        """关闭行情进程"""
+        self.command_queue.put(None)
+        self.process.join()
+
+        self.data_queue.put(None)
+
+
+def run_market_process(username: str, password: str, command_queue: Queue, data_queue: Queue) -> None:
+    """行情进程的运行函数，将推送数据解析后转发回主进程"""
+    # 先向主进程返回初始化结果，空字符串表示成功
+    try:
+        init(username, password)
+        client: LiveMarketDataClient = LiveMarketDataClient()
+    except Exception as ex:
+        data_queue.put(f"RQData接口初始化失败：{ex}")
+        return
+
+    data_queue.put("")
+
+    def forward(data: dict) -> None:
+        data_queue.put(parse_tick(data))
+
+    thread: Thread = client.listen(handler=forward)
+
+    while True:
+        rq_channel: Optional[str] = command_queue.get()
+        if rq_channel is None:
+            break
+
+        client.subscribe(rq_channel)
+
+    client.close()
+    thread.join()